@@ -0,0 +1,7 @@
+"""
+Benchmarks for the capture-to-disk and capture-to-browser pipelines.
+
+Run with `python -m bench run` (see README). All benchmarks are driven by
+finishcam.synthetic.SyntheticVideoCapture, so no camera is needed and results
+are comparable across commits and machines.
+"""
@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import logging
+import sys
+
+from finishcam.grabber import RESOLUTIONS
+from finishcam.livestream import LEVELS
+
+from bench.report import environment, default_output_path, write_results, compare
+from bench.stats import peak_rss_mb
+
+
+async def run(args):
+    results = {"environment": environment(), "args": vars(args)}
+
+    if "capture" not in args.skip:
+        from bench.capture import run_capture
+        results["capture"] = []
+        for fps in args.fps:
+            logging.info("Capture benchmark: %d fps @ %s", fps, args.resolution)
+            results["capture"].append(await run_capture(
+                fps, args.resolution, args.time_span, args.spans, args.slot_width,
+                args.webp_quality, not args.no_ai,
+            ))
+
+    if "encode" not in args.skip:
+        from bench.encode import run_encode
+        results["encode"] = []
+        for codec, quality in [("webp", args.webp_quality), ("webp", 30), ("jpeg", args.webp_quality), ("png", None)]:
+            logging.info("Encode benchmark: %s (quality %s)", codec, quality)
+            results["encode"].append(run_encode(
+                codec, quality, args.resolution, args.time_span, args.fps[0], args.slot_width, args.encode_repeat,
+            ))
+
+    if "fanout" not in args.skip:
+        from bench.fanout import run_fanout
+        results["fanout"] = []
+        for clients in args.clients:
+            logging.info("Websocket fan-out benchmark: %d clients", clients)
+            results["fanout"].append(await run_fanout(
+                clients, args.resolution, args.time_span, args.fps[0], args.slot_width, args.fanout_duration,
+                args.fanout_level,
+            ))
+
+    # process-wide high-water mark of all benchmarks above (entries report their RSS growth)
+    results["peak_rss_mb"] = peak_rss_mb()
+
+    output = args.output or default_output_path(results["environment"])
+    write_results(output, results)
+    logging.info("Results written to %s", output)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m bench", description="Benchmarks the finish cam pipelines on a synthetic frame source"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run benchmarks and write results as JSON")
+    run_parser.add_argument("-o", "--output",
+                            help="Output JSON file (default: ./bench-<hostname>-<commit>.json)")
+    run_parser.add_argument("-r", "--resolution", choices=list(RESOLUTIONS), default="hd",
+                            help="Resolution of the synthetic source (default: hd)")
+    run_parser.add_argument("-f", "--fps", type=int, nargs="+", default=[30, 60],
+                            help="Frame rates to try for sustained capture (default: 30 60)")
+    run_parser.add_argument("-t", "--time-span", type=int, default=2,
+                            help="Time in seconds per span image (default: 2)")
+    run_parser.add_argument("-s", "--spans", type=int, default=3,
+                            help="Number of spans to capture per frame rate (default: 3)")
+    run_parser.add_argument("-w", "--slot-width", type=int, default=2,
+                            help="Slot width in px (default: 2)")
+    run_parser.add_argument("--webp-quality", type=int, default=90,
+                            help="Quality for webp compression (default: 90)")
+    run_parser.add_argument("--no-ai", action="store_true",
+                            help="Disable AI image assembly during capture")
+    run_parser.add_argument("--encode-repeat", type=int, default=20,
+                            help="Encodes per codec (default: 20)")
+    run_parser.add_argument("-c", "--clients", type=int, nargs="+", default=[1, 5, 20],
+                            help="Numbers of simulated websocket clients (default: 1 5 20)")
+    run_parser.add_argument("--fanout-duration", type=float, default=5,
+                            help="Seconds per websocket fan-out run (default: 5)")
+    run_parser.add_argument("--fanout-level", type=int, default=0, choices=range(len(LEVELS)),
+                            help="Live stream quality level all fan-out clients are pinned to, "
+                                 "0 is the best (default: 0)")
+    run_parser.add_argument("--skip", nargs="*", default=[], choices=["capture", "encode", "fanout"],
+                            help="Benchmarks to skip")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline", help="Result JSON of the reference run")
+    compare_parser.add_argument("candidate", help="Result JSON to compare against the reference")
+
+    args = parser.parse_args()
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+
+    if args.command == "compare":
+        compare(args.baseline, args.candidate)
+    else:
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import asyncio
+import glob
+import json
+import logging
+import tempfile
+import time
+
+import finishcam.pubsub
+from finishcam.grabber import Grabber
+
+from bench.stats import StageTimer, current_rss_mb, rss_growth_mb
+
+SESSION_NAME = "bench"
+
+# a span counts as "without drops" if at least this share of frames was taken
+SUSTAINED_RATIO = 0.98
+
+
+async def run_capture(fps, resolution, time_span, spans, slot_width, webp_quality, enable_ai_image):
+    """
+    Runs the full capture-to-disk pipeline on a synthetic source for `spans` spans.
+
+    Measures latencies of the capture stages, the frame interval as seen by
+    TimeSpanGrabber.run and the achieved fps / dropped frames per span.
+    """
+    hub = finishcam.pubsub.Hub()
+    shutdown_event = asyncio.Event()
+    timer = StageTimer()
+
+    with tempfile.TemporaryDirectory() as outdir:
+        grabber = Grabber(
+            hub, SESSION_NAME, outdir, time_span, fps, slot_width, False, shutdown_event,
+            webp_quality=webp_quality, test_mode=None, resolution=resolution,
+            # unpaced: TimeSpanGrabber.run paces the reads, so capture_frame
+            # latency is the read itself and there is only one frame clock
+            synthetic_source=True, synthetic_paced=False, enable_ai_image=enable_ai_image,
+        )
+        timer.wrap(grabber, "capture_frame")
+        timer.wrap(grabber, "update_ai_image")
+        timer.wrap(grabber, "_Grabber__postprocess_capture", "postprocess_capture")
+        timer.wrap(hub, "publish", "hub_publish")
+        _track_frame_interval(hub, timer)
+
+        rss_before = current_rss_mb()
+        started = time.perf_counter()
+        task = asyncio.create_task(grabber.start())
+        deadline = started + time_span * (spans + 2)
+        while len(timer.samples["postprocess_capture"]) < spans and time.perf_counter() < deadline:
+            if task.done():
+                break
+            await asyncio.sleep(0.2)
+
+        shutdown_event.set()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        span_results = _span_results(outdir, time_span, fps)
+        rss_growth = rss_growth_mb(rss_before)
+
+    sustained = bool(span_results) and all(span["sustained"] for span in span_results)
+    if not sustained:
+        logging.warning("%d fps @ %s could not be sustained", fps, resolution)
+
+    return {
+        "fps": fps,
+        "resolution": resolution,
+        "time_span": time_span,
+        "slot_width": slot_width,
+        "ai_image": enable_ai_image,
+        "sustained": sustained,
+        "achieved_fps_min": min((span["fps"] for span in span_results), default=0.0),
+        "dropped_frames": sum(span["dropped_frames"] for span in span_results),
+        "spans": span_results,
+        "stages": timer.summary(),
+        "rss_growth_mb": rss_growth,
+    }
+
+
+def _track_frame_interval(hub, timer):
+    # TimeSpanGrabber.run publishes exactly one live_image per assembled frame
+    publish_threadsafe = hub.publish_threadsafe
+    last = [None]
+
+    def tracking_publish_threadsafe(**kwargs):
+        if "live_image" in kwargs:
+            now = time.perf_counter()
+            if last[0] is not None:
+                timer.add("frame_interval", now - last[0])
+            last[0] = now
+        publish_threadsafe(**kwargs)
+
+    hub.publish_threadsafe = tracking_publish_threadsafe
+
+
+def _span_results(outdir, time_span, fps):
+    expected = time_span * fps
+    results = []
+    for path in glob.glob(f"{outdir}/{SESSION_NAME}/img*.json"):
+        with open(path) as f:
+            metadata = json.load(f)
+        results.append({
+            "index": metadata["index"],
+            "frame_count": metadata["frame_count"],
+            "fps": metadata["fps"],
+            "dropped_frames": max(0, expected - metadata["frame_count"]),
+            "sustained": metadata["frame_count"] >= expected * SUSTAINED_RATIO,
+        })
+    return sorted(results, key=lambda span: span["index"])
@@ -0,0 +1,50 @@
+import time
+
+import cv2 as cv
+
+from finishcam.grabber import RESOLUTIONS
+from finishcam.synthetic import SyntheticVideoCapture
+
+from bench.stats import latency_summary
+
+# name -> (file extension, quality parameter or None)
+CODECS = {
+    "webp": (".webp", cv.IMWRITE_WEBP_QUALITY),
+    "jpeg": (".jpg", cv.IMWRITE_JPEG_QUALITY),
+    "png": (".png", None),
+}
+
+
+def run_encode(codec, quality, resolution, time_span, fps, slot_width, repeat):
+    """
+    Encodes a synthetic span image (as written by Grabber) `repeat` times.
+
+    Reports latency percentiles and throughput in images and megapixels per
+    second, plus the average compressed size.
+    """
+    extension, quality_param = CODECS[codec]
+    params = [quality_param, quality] if quality_param is not None and quality is not None else []
+
+    _, height = RESOLUTIONS[resolution]
+    width = time_span * fps * slot_width
+    ok, img = SyntheticVideoCapture(width, height, fps).read()
+
+    durations = []
+    total_bytes = 0
+    for _ in range(repeat):
+        t = time.perf_counter()
+        retval, buf = cv.imencode(extension, img, params)
+        durations.append(time.perf_counter() - t)
+        total_bytes += len(buf)
+
+    elapsed = sum(durations)
+    return {
+        "codec": codec,
+        "quality": quality if quality_param is not None else None,
+        "width": width,
+        "height": height,
+        "latency": latency_summary(durations),
+        "images_per_second": repeat / elapsed,
+        "megapixels_per_second": repeat * width * height / elapsed / 1e6,
+        "mean_output_bytes": total_bytes / repeat,
+    }
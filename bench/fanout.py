@@ -0,0 +1,120 @@
+import asyncio
+import contextlib
+import json
+import time
+
+import finishcam.pubsub
+import finishcam.webapp
+from finishcam.grabber import RESOLUTIONS
+from finishcam.livestream import LEVELS, LiveEncoder
+from finishcam.synthetic import SyntheticVideoCapture
+
+from bench.stats import StageTimer, latency_summary, current_rss_mb, rss_growth_mb
+
+LOOP_LAG_INTERVAL = 0.01
+
+
+async def run_fanout(clients, resolution, time_span, fps, slot_width, duration, level):
+    """
+    Streams a live span image to `clients` simulated /ws/live clients.
+
+    The image is republished at `fps` like TimeSpanGrabber.run does, while
+    the clients are connected through Quart's test client (no network). Reports
+    delivered messages, Hub.publish latency, event loop lag and CPU time per
+    delivered image as the cost of the fan-out.
+
+    All clients are pinned to the quality `level` (see livestream.LEVELS), so
+    the result does not depend on how far the adaptive ladder climbed within
+    `duration`. The levels the clients were actually served are reported.
+    """
+    app = finishcam.webapp.app
+    hub = finishcam.pubsub.Hub()
+    app.hub = hub
+    app.active_ws_tasks = set()
+    app.live_encoder = LiveEncoder()
+    app.live_stream_level = level
+
+    timer = StageTimer()
+    timer.wrap(hub, "publish", "hub_publish")
+
+    _, height = RESOLUTIONS[resolution]
+    ok, img = SyntheticVideoCapture(time_span * fps * slot_width, height, fps).read()
+    metadata = {"session_name": "bench", "index": 0, "time_start": time.time(),
+                "time_span": time_span, "height": height, "frame_count": 0, "fps": fps}
+
+    received = [{"messages": 0, "images": 0, "bytes": 0, "levels": set()} for _ in range(clients)]
+
+    async def consume(ws, stats):
+        while True:
+            message = await ws.receive()
+            stats["messages"] += 1
+            stats["bytes"] += len(message)
+            if message[0] == 0:
+                stats["images"] += 1
+                await ws.send("ack")  # like js/live.js
+            elif message[0] == 2:
+                stream_params = json.loads(message[1:])
+                stats["levels"].add(_level(stream_params["interval"], stream_params["quality"]))
+
+    async def measure_loop_lag():
+        while True:
+            t = time.perf_counter()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            timer.add("loop_lag", time.perf_counter() - t - LOOP_LAG_INTERVAL)
+
+    rss_before = current_rss_mb()
+    test_client = app.test_client()
+    async with contextlib.AsyncExitStack() as stack:
+        stack.callback(setattr, app, "live_stream_level", None)
+        background = []
+        for stats in received:
+            ws = await stack.enter_async_context(
+                test_client.websocket("/ws/live", subprotocols=["live-image", "metadata", "image-ack"])
+            )
+            background.append(asyncio.create_task(consume(ws, stats)))
+        background.append(asyncio.create_task(measure_loop_lag()))
+
+        cpu_start = time.process_time()
+        started = time.perf_counter()
+        while (elapsed := time.perf_counter() - started) < duration:
+            metadata["frame_count"] += 1
+            hub.publish(live_image=img, live_metadata=metadata)
+            await asyncio.sleep(max(0.0, metadata["frame_count"] / fps - elapsed))
+        cpu_seconds = time.process_time() - cpu_start
+        wall_seconds = time.perf_counter() - started
+
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+
+    images = sum(stats["images"] for stats in received)
+    min_images = min(stats["images"] for stats in received)
+    if min_images == 0:
+        # a broken /ws/live must not pass as a cheap fan-out
+        raise RuntimeError(f"Websocket fan-out with {clients} clients: at least one client received no image")
+    interval, scale, quality = LEVELS[level]
+    return {
+        "clients": clients,
+        "resolution": resolution,
+        "publish_fps": fps,
+        "level": level,
+        "level_interval": interval,
+        "level_scale": scale,
+        "level_quality": quality,
+        "levels_served": sorted(set().union(*(stats["levels"] for stats in received))),
+        "duration": wall_seconds,
+        "images_per_client_per_second": images / clients / wall_seconds,
+        "bytes_per_client_per_second": sum(stats["bytes"] for stats in received) / clients / wall_seconds,
+        "min_images_per_client": min_images,
+        "cpu_percent": 100.0 * cpu_seconds / wall_seconds,
+        "cpu_ms_per_delivered_image": 1000.0 * cpu_seconds / images if images else None,
+        "hub_publish": latency_summary(timer.samples["hub_publish"]),
+        "loop_lag": latency_summary(timer.samples["loop_lag"]),
+        "rss_growth_mb": rss_growth_mb(rss_before),
+    }
+
+
+def _level(interval, quality):
+    # the level a client was served, from its stream settings message
+    return next(i for i, (level_interval, _, level_quality) in enumerate(LEVELS)
+                if (level_interval, level_quality) == (interval, quality))
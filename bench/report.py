@@ -0,0 +1,70 @@
+import datetime
+import json
+import os
+import platform
+import subprocess
+
+import cv2 as cv
+import numpy as np
+
+
+def environment():
+    """Describes commit and hardware, so results of different runs can be told apart."""
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "hostname": platform.node(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "opencv": cv.__version__,
+        "numpy": np.__version__,
+        "timestamp": datetime.datetime.now().astimezone().isoformat(timespec="seconds"),
+    }
+
+
+def default_output_path(env):
+    commit = (env.get("commit") or "nocommit")[:8]
+    return f"bench-{env['hostname']}-{commit}.json"
+
+
+def write_results(path, results):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=4)
+
+
+def compare(baseline_path, candidate_path):
+    """Prints all numeric results present in both files with their relative change."""
+    with open(baseline_path) as f:
+        baseline = _flatten(json.load(f))
+    with open(candidate_path) as f:
+        candidate = _flatten(json.load(f))
+
+    print(f"{'metric':<70} {'baseline':>12} {'candidate':>12} {'change':>8}")
+    for key, old in baseline.items():
+        new = candidate.get(key)
+        if new is None or key.startswith(("environment.", "args.")):
+            continue
+        change = f"{(new - old) / old * 100:+.1f}%" if old else ""
+        print(f"{key:<70} {old:>12.3f} {new:>12.3f} {change:>8}")
+
+
+def _flatten(data, prefix=""):
+    # nested dicts/lists -> {"capture.0.stages.capture_frame.p99_ms": 1.2, ...}
+    items = data.items() if isinstance(data, dict) else enumerate(data)
+    flat = {}
+    for key, value in items:
+        path = f"{prefix}{key}"
+        if isinstance(value, (dict, list)):
+            flat.update(_flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
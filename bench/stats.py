@@ -0,0 +1,85 @@
+import time
+import platform
+import resource
+from collections import defaultdict
+
+import numpy as np
+
+
+class StageTimer:
+    """
+    Collects wall-clock durations per pipeline stage.
+
+    Stages are measured by wrapping bound methods on live objects (see wrap()),
+    so the production code needs no instrumentation. Appending to the sample
+    lists is safe from the capture threads.
+    """
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def add(self, stage, seconds):
+        self.samples[stage].append(seconds)
+
+    def wrap(self, obj, attr, stage=None):
+        """Replaces obj.attr by a timed version recording into `stage` (default: attr)."""
+        func = getattr(obj, attr)
+        samples = self.samples[stage or attr]
+
+        def timed(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - t)
+
+        setattr(obj, attr, timed)
+
+    def summary(self):
+        return {stage: latency_summary(samples) for stage, samples in self.samples.items()}
+
+
+def latency_summary(samples):
+    """Percentiles (in milliseconds) of the given durations (in seconds)."""
+    if not samples:
+        return {"count": 0}
+    ms = np.asarray(samples) * 1000.0
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(p50),
+        "p90_ms": float(p90),
+        "p99_ms": float(p99),
+        "max_ms": float(ms.max()),
+    }
+
+
+def current_rss_mb():
+    """Current resident set size of this process (None where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * resource.getpagesize() / (1024 * 1024)
+
+
+def rss_growth_mb(rss_before):
+    """Growth of the resident set size since `rss_before` (from current_rss_mb)."""
+    rss_after = current_rss_mb()
+    if rss_before is None or rss_after is None:
+        return None
+    return rss_after - rss_before
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process so far.
+
+    This is a process-wide high-water mark, so it is reported once per
+    benchmark run; single entries report rss_growth_mb() instead.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
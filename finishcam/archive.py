@@ -0,0 +1,235 @@
+"""
+Packs finished sessions into a single indexed archive file.
+
+Layout of `<outdir>/<session_name>.fcarchive`:
+
+    MAGIC | file blobs ... | JSON table | trailer (table offset, MAGIC)
+
+The JSON table holds the session metadata (the session's index.json) and the
+byte offset and size of each packed file, so every file can be read with one
+seek and one read on an already open file handle.
+"""
+
+import argparse
+import collections
+import json
+import logging
+import os
+import re
+import shutil
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b"PFCARCH1"
+TRAILER = struct.Struct("<Q8s")
+EXTENSION = ".fcarchive"
+
+
+class ArchiveError(Exception):
+    """Exception raised when an archive file is invalid."""
+    pass
+
+
+def archive_path(outdir, session_name):
+    return os.path.join(outdir, f"{session_name}{EXTENSION}")
+
+
+def pack_session(outdir, session_name, remove=False):
+    """
+    Packs all files of a session directory into its archive.
+
+    The archive is written to a temporary file first and only then moved in
+    place. With remove=True the session directory is deleted after every file
+    was read back from the archive and compared.
+    """
+    session_dir = os.path.join(outdir, session_name)
+    names = sorted(os.listdir(session_dir), key=_natural_sort_key)
+    path = archive_path(outdir, session_name)
+
+    with open(os.path.join(session_dir, "index.json"), "r") as f:
+        metadata = json.load(f)
+
+    entries = {}
+    with open(f"{path}.tmp", "wb") as archive_file:
+        archive_file.write(MAGIC)
+        for name in names:
+            offset = archive_file.tell()
+            with open(os.path.join(session_dir, name), "rb") as f:
+                shutil.copyfileobj(f, archive_file)
+            entries[name] = [offset, archive_file.tell() - offset]
+
+        table_offset = archive_file.tell()
+        table = {"version": 1, "session_name": session_name, "metadata": metadata, "entries": entries}
+        archive_file.write(json.dumps(table).encode("utf-8"))
+        archive_file.write(TRAILER.pack(table_offset, MAGIC))
+    os.replace(f"{path}.tmp", path)
+
+    if remove:
+        with SessionArchive(path) as archive:
+            for name in names:
+                with open(os.path.join(session_dir, name), "rb") as f:
+                    if archive.read(name) != f.read():
+                        raise ArchiveError(f"{path}: {name} differs from {session_dir}/{name}")
+        shutil.rmtree(session_dir)
+
+    return path
+
+
+class SessionArchive:
+    """
+    Read access to a packed session.
+
+    Keeps one file handle open; reads are serialized by a lock, as they may
+    come from several threads (see SessionStore).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.mtime = os.fstat(self.file.fileno()).st_mtime
+        self.lock = threading.Lock()
+        try:
+            self.table = self.__read_table()
+        except Exception:
+            self.file.close()
+            raise
+        self.entries = self.table["entries"]
+        self.metadata = self.table["metadata"]
+
+    def read(self, name):
+        if name not in self.entries:
+            raise FileNotFoundError(f"{self.path}: no entry {name}")
+        offset, size = self.entries[name]
+        with self.lock:
+            self.file.seek(offset)
+            return self.file.read(size)
+
+    def etag(self, name):
+        # archives are only ever replaced as a whole, so mtime + position identify an entry
+        offset, size = self.entries[name]
+        return f"{int(self.mtime)}-{offset}-{size}"
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def __read_table(self):
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ArchiveError(f"{self.path}: not a session archive")
+        self.file.seek(-TRAILER.size, os.SEEK_END)
+        trailer_offset = self.file.tell()
+        table_offset, magic = TRAILER.unpack(self.file.read(TRAILER.size))
+        if magic != MAGIC:
+            raise ArchiveError(f"{self.path}: truncated session archive")
+        self.file.seek(table_offset)
+        return json.loads(self.file.read(trailer_offset - table_offset))
+
+
+class SessionStore:
+    """
+    Reads session files from the session directory or, for packed sessions,
+    from their archive. Keeps the most recently used archives open.
+    """
+
+    def __init__(self, outdir, max_open_archives=32):
+        self.outdir = outdir
+        self.max_open_archives = max_open_archives
+        self.archives = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def exists(self, session_name):
+        """Whether `session_name` is a plain name (no path) of an unpacked or packed session."""
+        if not isinstance(session_name, str) or not session_name or session_name.startswith("."):
+            return False
+        if "/" in session_name or "\\" in session_name or os.sep in session_name:
+            return False
+        return (os.path.isdir(os.path.join(self.outdir, session_name))
+                or os.path.isfile(archive_path(self.outdir, session_name)))
+
+    def is_packed(self, session_name):
+        return (not os.path.isdir(os.path.join(self.outdir, session_name))
+                and os.path.isfile(archive_path(self.outdir, session_name)))
+
+    def read(self, session_name, name):
+        if not self.is_packed(session_name):
+            with open(os.path.join(self.outdir, session_name, name), "rb") as f:
+                return f.read()
+        return self.archive(session_name).read(name)
+
+    def archive(self, session_name):
+        with self.lock:
+            archive = self.archives.pop(session_name, None)
+            if archive is None:
+                archive = SessionArchive(archive_path(self.outdir, session_name))
+            self.archives[session_name] = archive
+            while len(self.archives) > self.max_open_archives:
+                _, evicted = self.archives.popitem(last=False)
+                evicted.close()
+            return archive
+
+
+def is_finished(outdir, session_name, min_age):
+    """Whether the session's index.json was not touched for `min_age` seconds."""
+    index_path = os.path.join(outdir, session_name, "index.json")
+    return os.path.isfile(index_path) and time.time() - os.path.getmtime(index_path) >= min_age
+
+
+def finished_sessions(outdir, min_age):
+    """Unpacked sessions considered finished (see is_finished)."""
+    return [s for s in sorted(os.listdir(outdir)) if is_finished(outdir, s, min_age)]
+
+
+def _natural_sort_key(name):
+    # img2.webp before img10.webp
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m finishcam.archive",
+        description="Packs finished sessions into one indexed archive file each"
+    )
+    parser.add_argument("sessions", nargs="*", help="Session names to pack")
+    parser.add_argument("-o", "--outdir", default="data", help="Output directory of main.py (default: './data')")
+    parser.add_argument("-a", "--all", action="store_true",
+                        help="Pack all finished sessions (see --min-age)")
+    parser.add_argument("--min-age", type=int, default=3600,
+                        help="Seconds since the last write for a session to count as finished (default: 3600)")
+    parser.add_argument("--force", action="store_true",
+                        help="Also pack named sessions not counting as finished (never use on the running session)")
+    parser.add_argument("--remove", action="store_true",
+                        help="Remove session directories after packing and verifying them")
+    args = parser.parse_args()
+
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+
+    sessions = list(args.sessions)
+    if args.all:
+        sessions += [s for s in finished_sessions(args.outdir, args.min_age) if s not in sessions]
+    if not sessions:
+        parser.error("no sessions given (name them or use --all)")
+
+    skipped = False
+    for session_name in sessions:
+        if not args.force and not is_finished(args.outdir, session_name, args.min_age):
+            # might be the session currently captured
+            logging.error("Skipping %s: not finished (written within --min-age seconds or no index.json), "
+                          "use --force to pack it anyway", session_name)
+            skipped = True
+            continue
+        path = pack_session(args.outdir, session_name, remove=args.remove)
+        logging.info("Packed %s into %s", session_name, path)
+
+    if skipped:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ import logging
 import platform
 
 from finishcam.timespan_grabber import TimeSpanGrabber
+from finishcam.synthetic import SyntheticVideoCapture
+from finishcam.startup import timeline
 
 def create_task(hub, session_name, outdir, time_span, fps, slot_width, left_to_right, shutdown_event, **kwargs):
     grabber = Grabber(
@@ -24,6 +26,21 @@ class VideoException(Exception):
 
 STAMPS_COLOR = (100, 255, 100)
 
+RESOLUTIONS = {
+    "qvga": (320, 240), "vga": (640, 480), "svga": (800, 600),
+    "xga": (1024, 768), "wxga": (1280, 800), "hd": (1280, 720),
+    "sxga": (1280, 1024), "uxga": (1600, 1200),
+    "fullhd": (1920, 1080), "4k": (3840, 2160)
+}
+
+# names used in the camera format cache -> OpenCV properties
+CAMERA_PROPERTIES = {
+    "fourcc": cv.CAP_PROP_FOURCC,
+    "fps": cv.CAP_PROP_FPS,
+    "width": cv.CAP_PROP_FRAME_WIDTH,
+    "height": cv.CAP_PROP_FRAME_HEIGHT,
+}
+
 class Grabber:
     """
     Controls the full image capture loop.
@@ -55,6 +72,10 @@ class Grabber:
         self.test_mode = kwargs.get("test_mode", 0)
         self.resolution = kwargs.get("resolution", "hd")
         self.video_capture_index = kwargs.get("video_capture_index", 0)
+        self.synthetic_source = kwargs.get("synthetic_source", False)
+        self.synthetic_paced = kwargs.get("synthetic_paced", True)
+        self.camera_format_cache = kwargs.get("camera_format_cache", None)
+        self.frame_shape_verified = True  # False while the frame shape is only known from the cache
         self.stamp_options = {
             "time": kwargs.get("stamp_time", True),
             "fps": kwargs.get("stamp_fps", False),
@@ -64,7 +85,8 @@ class Grabber:
 
     async def start(self):
         os.makedirs(f"{self.outdir}/{self.session_name}", exist_ok=True)
-        self.__init_video()
+        # open the camera in a thread, so the web server can start meanwhile
+        await asyncio.to_thread(self.__init_video)
 
         try:
             await self.start_capture()
@@ -119,6 +141,10 @@ class Grabber:
             ret, src = self.video_capture.read()
             if not ret:
                 raise VideoException("Can't receive frame")
+            if not self.frame_shape_verified:
+                self.__verify_frame_shape(src)
+
+        timeline.mark("first frame")
 
         return cv.flip(src, 1) if self.left_to_right else src
 
@@ -227,39 +253,87 @@ class Grabber:
         }
 
     def __init_video(self):
-        # OpenCV backend choice depending on platform
-        is_linux = platform.system() == "Linux"
-        backend = cv.CAP_V4L2 if is_linux else cv.CAP_ANY
-        self.video_capture = cv.VideoCapture(self.video_capture_index, backend)
-
-        if is_linux:
-            # Use MJPEG codec to improve frame rate stability (especially on Linux/V4L2)
-            self.video_capture.set(cv.CAP_PROP_FOURCC, cv.VideoWriter_fourcc(*'MJPG'))
-
-        resolutions = {
-            "qvga": (320, 240), "vga": (640, 480), "svga": (800, 600),
-            "xga": (1024, 768), "wxga": (1280, 800), "hd": (1280, 720),
-            "sxga": (1280, 1024), "uxga": (1600, 1200),
-            "fullhd": (1920, 1080), "4k": (3840, 2160)
-        }
-        width, height = resolutions[self.resolution]
-        self.video_capture.set(cv.CAP_PROP_FPS, self.fps)
-        self.video_capture.set(cv.CAP_PROP_FRAME_WIDTH, width)
-        self.video_capture.set(cv.CAP_PROP_FRAME_HEIGHT, height)
+        width, height = RESOLUTIONS[self.resolution]
+        cached_format = None
+
+        if self.synthetic_source:
+            # moving test pattern instead of a real camera (test mode, benchmarks)
+            self.video_capture = SyntheticVideoCapture(width, height, self.fps, paced=self.synthetic_paced)
+        else:
+            if self.camera_format_cache:
+                cached_format = self.camera_format_cache.get(self.__camera_format_key())
+
+            # OpenCV backend choice depending on platform
+            is_linux = platform.system() == "Linux"
+            backend = cv.CAP_V4L2 if is_linux else cv.CAP_ANY
+
+            if cached_format:
+                # apply the format negotiated on the last start as open params in one
+                # step, instead of one set() (and maybe stream restart) per property
+                params = []
+                for name, prop in CAMERA_PROPERTIES.items():
+                    params += [prop, round(cached_format[name])]
+                self.video_capture = cv.VideoCapture(self.video_capture_index, backend, params)
+                if not self.video_capture.isOpened():
+                    logging.warning("Camera rejects the cached camera format, opening it without")
+                    self.video_capture.release()
+                    cached_format = None
+
+            if not cached_format:
+                self.video_capture = cv.VideoCapture(self.video_capture_index, backend)
+
+                requested = {"fps": self.fps, "width": width, "height": height}
+                if is_linux:
+                    # Use MJPEG codec to improve frame rate stability (especially on Linux/V4L2)
+                    requested = {"fourcc": cv.VideoWriter_fourcc(*'MJPG'), **requested}
+                for name, value in requested.items():
+                    self.video_capture.set(CAMERA_PROPERTIES[name], value)
 
         if not self.video_capture.isOpened():
             raise VideoException("Cannot open camera")
+        timeline.mark("camera open")
 
         logging.info("Camera: %dx%d @ %.1f FPS",
                      self.video_capture.get(cv.CAP_PROP_FRAME_WIDTH),
                      self.video_capture.get(cv.CAP_PROP_FRAME_HEIGHT),
                      self.video_capture.get(cv.CAP_PROP_FPS))
 
-        # read one frame to determine frame shape
-        src = self.capture_frame()
-        self.src_height, self.src_width = src.shape[:2]
+        if cached_format:
+            # trust the cached frame shape, the first real frame verifies it (see capture_frame)
+            self.src_height, self.src_width = cached_format["frame_height"], cached_format["frame_width"]
+            self.frame_shape_verified = False
+        else:
+            # read one frame to determine frame shape
+            src = self.capture_frame()
+            self.src_height, self.src_width = src.shape[:2]
+            if self.camera_format_cache and not self.synthetic_source:
+                self.__store_camera_format()
         self.src_middle_left = self.src_width // 2
 
+    def __verify_frame_shape(self, src):
+        self.frame_shape_verified = True
+        height, width = src.shape[:2]
+        if (height, width) == (self.src_height, self.src_width):
+            return
+        # stale cache (e.g. other camera plugged in): never fail the run, just
+        # re-initialise the frame size and renew the cache
+        logging.warning("Camera delivers %dx%d instead of cached %dx%d, updating camera format cache",
+                        width, height, self.src_width, self.src_height)
+        self.src_height, self.src_width = height, width
+        self.src_middle_left = self.src_width // 2
+        self.__store_camera_format()
+
+    def __camera_format_key(self):
+        return f"{platform.system()}:{self.video_capture_index}:{self.resolution}@{self.fps}"
+
+    def __store_camera_format(self):
+        camera_format = {
+            name: self.video_capture.get(prop) for name, prop in CAMERA_PROPERTIES.items()
+        }
+        camera_format["frame_width"] = self.src_width
+        camera_format["frame_height"] = self.src_height
+        self.camera_format_cache.put(self.__camera_format_key(), camera_format)
+
     def __stop_video(self):
         # release camera safely even if thread is reading
         if self.video_capture:
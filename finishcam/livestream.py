@@ -0,0 +1,156 @@
+import asyncio
+import collections
+import re
+
+import cv2 as cv
+
+# Quality ladder from best to worst: (update interval in s, downscale factor, webp quality).
+# Clients start at the former fixed settings and move along the ladder.
+LEVELS = [
+    (0.1, 1.0, 50),
+    (0.2, 1.0, 40),
+    (0.3, 1.0, 30),
+    (0.5, 0.75, 30),
+    (0.75, 0.5, 25),
+    (1.0, 0.5, 20),
+    (1.5, 0.35, 15),
+    (2.0, 0.25, 10),
+]
+START_LEVEL = 2
+
+# share of the update interval an image delivery may take before the client is considered too slow ...
+SEND_BUDGET = 0.5
+# ... and how fast deliveries need to be (relative to the budget) for a number of updates to step up again
+UPGRADE_MARGIN = 0.25
+UPGRADE_AFTER = 10
+
+# images a client may have in flight (sent, but not acknowledged yet); clients
+# without acks are limited to the one image currently being sent
+MAX_IN_FLIGHT = 2
+
+CLIENT_HINT = re.compile(r"max-(width|height)-(\d+)")
+
+
+def parse_client_hints(subprotocols):
+    """Reads hints like 'max-width-800' from the subprotocols requested by js/live.js."""
+    hints = {}
+    for subprotocol in subprotocols:
+        if match := CLIENT_HINT.fullmatch(subprotocol):
+            hints[f"max_{match[1]}"] = int(match[2])
+    return hints
+
+
+class AdaptiveStream:
+    """
+    Live preview settings of one WebSocket client, adapted to its throughput.
+
+    Tracks the images in flight: sent, but not yet acknowledged by the client
+    (js/live.js acks each image), or for clients without acks, not yet handed
+    to the transport. Their delivery delay drives the quality ladder: delays
+    exceeding SEND_BUDGET of the update interval step down (more than a whole
+    interval steps down twice), a series of fast deliveries steps up again.
+
+    With MAX_IN_FLIGHT images pending, no further image is sent, and the
+    stream keeps stepping down as long as the oldest one is overdue. So a
+    stalled client ends up at the lowest level instead of holding resources.
+    Client hints cap the scale. A pinned level (used by the benchmarks) is
+    never left, only the in-flight limit still applies.
+    """
+
+    def __init__(self, max_width=None, max_height=None, acks=False, pinned_level=None):
+        self.max_width = max_width
+        self.max_height = max_height
+        self.acks = acks
+        self.pinned = pinned_level is not None
+        self.level = pinned_level if self.pinned else START_LEVEL
+        self.fast_sends = 0
+        self.sent_at = collections.deque()  # send times of images in flight
+
+    @property
+    def interval(self):
+        return LEVELS[self.level][0]
+
+    @property
+    def quality(self):
+        return LEVELS[self.level][2]
+
+    @property
+    def in_flight(self):
+        return len(self.sent_at)
+
+    def scale_for(self, width, height):
+        scale = LEVELS[self.level][1]
+        if self.max_width:
+            scale = min(scale, self.max_width / width)
+        if self.max_height:
+            scale = min(scale, self.max_height / height)
+        # round down to 5% steps, so clients with similar hints share encodings
+        return max(int(scale * 20), 1) / 20
+
+    def can_send(self, now, sending=False):
+        """
+        Whether the next image may be sent. `sending` tells that a send is
+        still blocked in the transport. Steps down while the backlog is overdue.
+        """
+        max_in_flight = MAX_IN_FLIGHT if self.acks else 1
+        if not sending and self.in_flight < max_in_flight:
+            return True
+        if self.sent_at and now - self.sent_at[0] > self.interval:
+            self.__step(1)
+        return False
+
+    def image_sent(self, now):
+        self.sent_at.append(now)
+
+    def image_delivered(self, now):
+        """Called on the client's ack, or when the send completed for clients without acks."""
+        if not self.sent_at:
+            return  # unexpected ack
+        delay = now - self.sent_at.popleft()
+        budget = self.interval * SEND_BUDGET
+        if delay > self.interval:
+            self.__step(2)
+        elif delay > budget:
+            self.__step(1)
+        elif delay < budget * UPGRADE_MARGIN:
+            self.fast_sends += 1
+            if self.fast_sends >= UPGRADE_AFTER:
+                self.__step(-1)
+        else:
+            self.fast_sends = 0
+
+    def __step(self, levels):
+        if self.pinned:
+            return
+        self.level = min(max(self.level + levels, 0), len(LEVELS) - 1)
+        self.fast_sends = 0
+
+
+class LiveEncoder:
+    """
+    Encodes each live frame at most once per (scale, quality).
+
+    All WebSocket clients share the encodings of the current frame, so the
+    encoding work depends on the number of distinct settings, not clients.
+    """
+
+    def __init__(self):
+        self.frame_key = None
+        self.encodings = {}
+
+    async def encode(self, img, frame_key, scale, quality):
+        if frame_key != self.frame_key:
+            self.frame_key = frame_key
+            self.encodings = {}
+        key = (scale, quality)
+        if key not in self.encodings:
+            self.encodings[key] = asyncio.create_task(asyncio.to_thread(_encode, img, scale, quality))
+        # shielded: a client going away must not cancel the encoding for the others
+        return await asyncio.shield(self.encodings[key])
+
+
+def _encode(img, scale, quality):
+    if scale < 1:
+        img = cv.resize(img, None, fx=scale, fy=scale, interpolation=cv.INTER_AREA)
+    retval, buf = cv.imencode(".webp", img, [cv.IMWRITE_WEBP_QUALITY, quality])
+    return buf
@@ -0,0 +1,176 @@
+import base64
+import bisect
+import collections
+import json
+import math
+import threading
+
+import cv2 as cv
+import numpy as np
+
+
+class MeasurementError(Exception):
+    """Exception raised when a time or column is not covered by a session."""
+    pass
+
+
+class SessionTimeIndex:
+    """
+    Start times of all finished spans of a session.
+
+    The start times are sorted, so mapping a time to (span index, column x)
+    is a binary search. Columns map to time the same way js/measuring does:
+    x pixels right of the span start are x / px_per_second seconds later.
+    """
+
+    def __init__(self, metadata, span_starts):
+        self.metadata = metadata
+        self.span_starts = span_starts
+        self.px_per_second = metadata["px_per_second"]
+        self.width = metadata["time_span"] * self.px_per_second
+
+    def time_end(self):
+        if not self.span_starts:
+            return None
+        return self.span_starts[-1] + self.metadata["time_span"]
+
+    def locate(self, t):
+        index = bisect.bisect_right(self.span_starts, t) - 1
+        if index < 0:
+            raise MeasurementError(f"{t} is before the start of session {self.metadata['session_name']}")
+        x = int((t - self.span_starts[index]) * self.px_per_second)
+        if x >= self.width:
+            raise MeasurementError(f"{t} is not covered by a finished span of session {self.metadata['session_name']}")
+        return index, x
+
+    def time_at(self, index, x):
+        if not 0 <= index < len(self.span_starts):
+            raise MeasurementError(f"Session {self.metadata['session_name']} has no finished span {index}")
+        if not 0 <= x < self.width:
+            raise MeasurementError(f"x must be between 0 and {self.width - 1}")
+        return self.span_starts[index] + x / self.px_per_second
+
+
+class MeasurementService:
+    """
+    Server side crossing time lookups for `(session, t)` or `(session, index, x)`.
+
+    Keeps a SessionTimeIndex per session (extended when a live session grew)
+    and the most recently decoded span images in a bounded LRU cache. Runs in
+    worker threads, so shared state is guarded by a lock.
+    """
+
+    def __init__(self, session_store, max_strips=16):
+        self.session_store = session_store
+        self.max_strips = max_strips
+        self.time_indexes = {}
+        self.strips = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def measure_batch(self, queries):
+        results = []
+        for query in queries:
+            try:
+                results.append(self.measure(query))
+            except FileNotFoundError:
+                # don't expose server paths
+                results.append({"query": query, "error": "Unknown session or span"})
+            except (MeasurementError, KeyError, TypeError, ValueError) as e:
+                results.append({"query": query, "error": str(e) or repr(e)})
+        return results
+
+    def measure(self, query):
+        """
+        Resolves one query: {"session", "t"} or {"session", "index", "x"}.
+
+        Optional keys are "neighbours" (columns to each side, default 2) and
+        "crop_width" (px around x returned as WebP data URL, default 64, 0 disables).
+        """
+        session_name = query["session"]
+        if not self.session_store.exists(session_name):
+            raise MeasurementError(f"Unknown session {session_name!r}")
+        time_index = self.time_index(session_name)
+
+        if "t" in query:
+            t = _number(query, "t")
+            if time_index.time_end() is None or t >= time_index.time_end():
+                time_index = self.time_index(session_name, refresh=True)
+            index, x = time_index.locate(t)
+        else:
+            index, x = int(_number(query, "index")), int(_number(query, "x"))
+            if index >= len(time_index.span_starts):
+                time_index = self.time_index(session_name, refresh=True)
+
+        neighbours = int(_number(query, "neighbours", 2))
+        columns = range(max(0, x - neighbours), min(time_index.width, x + neighbours + 1))
+        result = {
+            "session": session_name,
+            "index": index,
+            "x": x,
+            "time": time_index.time_at(index, x),
+            "columns": [{"x": column, "time": time_index.time_at(index, column)} for column in columns],
+        }
+
+        crop_width = int(_number(query, "crop_width", 64))
+        if crop_width > 0:
+            result["crop"] = self.crop(session_name, index, x, crop_width)
+        return result
+
+    def time_index(self, session_name, refresh=False):
+        with self.lock:
+            time_index = self.time_indexes.get(session_name)
+        if time_index is None or refresh:
+            time_index = self.__load_time_index(session_name, time_index)
+            with self.lock:
+                self.time_indexes[session_name] = time_index
+        return time_index
+
+    def crop(self, session_name, index, x, width):
+        strip = self.strip(session_name, index)
+        left = max(0, x - width // 2)
+        retval, buf = cv.imencode(".webp", strip[:, left : left + width], [cv.IMWRITE_WEBP_QUALITY, 90])
+        return {
+            "left": left,
+            "width": min(width, strip.shape[1] - left),
+            "image": "data:image/webp;base64," + base64.b64encode(buf).decode("ascii"),
+        }
+
+    def strip(self, session_name, index):
+        key = (session_name, index)
+        with self.lock:
+            if key in self.strips:
+                self.strips.move_to_end(key)
+                return self.strips[key]
+
+        data = self.session_store.read(session_name, f"img{index}.webp")
+        strip = cv.imdecode(np.frombuffer(data, np.uint8), cv.IMREAD_COLOR)
+        if strip is None:
+            raise MeasurementError(f"Could not decode span {index} of session {session_name}")
+
+        with self.lock:
+            self.strips[key] = strip
+            while len(self.strips) > self.max_strips:
+                self.strips.popitem(last=False)
+        return strip
+
+    def __load_time_index(self, session_name, previous):
+        metadata = json.loads(self.session_store.read(session_name, "index.json"))
+        span_starts = list(previous.span_starts) if previous else []
+
+        # only read the per-span metadata of spans not indexed yet
+        last_index = metadata["last_index"]
+        for index in range(len(span_starts), (last_index + 1) if last_index is not None else 0):
+            span = json.loads(self.session_store.read(session_name, f"img{index}.json"))
+            span_starts.append(span["time_start"])
+        return SessionTimeIndex(metadata, span_starts)
+
+
+def _number(query, key, default=None):
+    value = query.get(key, default) if default is not None else query[key]
+    try:
+        number = float(value)
+    except OverflowError:
+        number = math.inf
+    if not math.isfinite(number):
+        raise MeasurementError(f"{key} must be a finite number")
+    return number
@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+import time
+
+
+class StartupTimeline:
+    """
+    Logs how long it takes from program start to the first captured frame.
+
+    Each step (imports, camera open, first frame, server listening) is logged
+    once with its offset to the creation of the timeline. Marking a step again
+    is a cheap no-op, so marks can sit in hot paths like Grabber.capture_frame.
+    """
+
+    def __init__(self):
+        self.time_start = time.monotonic()
+        self.marks = {}
+
+    def mark(self, step):
+        if step in self.marks:
+            return
+        self.marks[step] = time.monotonic() - self.time_start
+        logging.info("Startup timeline: %-18s +%.3fs", step, self.marks[step])
+
+
+# shared by all modules, created when main.py is imported
+timeline = StartupTimeline()
+
+
+class TimelineLogFilter(logging.Filter):
+    """
+    Marks a timeline step when a log message starting with `prefix` passes by.
+
+    Used for events only visible in third party logs, e.g. Hypercorn's
+    "Running on ..." message once the server socket is listening.
+    """
+
+    def __init__(self, prefix, step):
+        super().__init__()
+        self.prefix = prefix
+        self.step = step
+
+    def filter(self, record):
+        if record.getMessage().startswith(self.prefix):
+            timeline.mark(self.step)
+        return True  # never suppresses anything
+
+
+def default_camera_format_cache_path():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "perp-finish-cam", "camera_formats.json")
+
+
+class CameraFormatCache:
+    """
+    Remembers the camera format negotiated per device and requested mode.
+
+    Lets Grabber apply the format as open params in one step on later starts
+    and skip reading a probe frame for the frame shape. An entry not matching
+    the frames the camera actually delivers is renewed, and failing to read or
+    write the cache never prevents capturing.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_camera_format_cache_path()
+
+    def get(self, key):
+        return self.__load().get(key)
+
+    def put(self, key, camera_format):
+        formats = self.__load()
+        formats[key] = camera_format
+        self.__save(formats)
+
+    def __load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable camera format cache %s: %s", self.path, e)
+            return {}
+
+    def __save(self, formats):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(f"{self.path}.tmp", "w") as f:
+                json.dump(formats, f, indent=4)
+            os.replace(f"{self.path}.tmp", self.path)
+        except OSError as e:
+            logging.warning("Could not write camera format cache %s: %s", self.path, e)
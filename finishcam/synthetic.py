@@ -0,0 +1,96 @@
+import cv2 as cv
+import numpy as np
+import time
+
+
+class SyntheticVideoCapture:
+    """
+    Stand-in for cv.VideoCapture that renders a moving test pattern.
+
+    Frames scroll a colored stripe pattern with dark "boats" horizontally by a
+    fixed amount per frame, so the slot in the middle of the frame sees
+    movement just like at a real finish line. Reads are paced to the requested
+    FPS like a real camera (frames are skipped, not queued, when the consumer
+    falls behind). With paced=False reads return immediately, leaving the
+    pacing to the consumer (TimeSpanGrabber.run paces itself anyway).
+
+    Used by the --synthetic command line option and the benchmarks.
+    """
+
+    def __init__(self, width, height, fps, speed=7, paced=True):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.speed = speed
+        self.paced = paced
+
+        self._pattern = None
+        self._frame_index = 0
+        self._next_frame_time = None
+        self._opened = True
+
+    def isOpened(self):
+        return self._opened
+
+    def set(self, prop, value):
+        if prop == cv.CAP_PROP_FPS:
+            self.fps = value
+        elif prop == cv.CAP_PROP_FRAME_WIDTH:
+            self.width = int(value)
+            self._pattern = None
+        elif prop == cv.CAP_PROP_FRAME_HEIGHT:
+            self.height = int(value)
+            self._pattern = None
+        return True
+
+    def get(self, prop):
+        return {
+            cv.CAP_PROP_FPS: float(self.fps),
+            cv.CAP_PROP_FRAME_WIDTH: float(self.width),
+            cv.CAP_PROP_FRAME_HEIGHT: float(self.height),
+        }.get(prop, 0.0)
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        if self._pattern is None:
+            self._pattern = self.__render_pattern()
+
+        if self.paced:
+            self.__wait_for_frame()
+
+        offset = (self._frame_index * self.speed) % self.width
+        self._frame_index += 1
+        return True, self._pattern[:, offset : offset + self.width].copy()
+
+    def release(self):
+        self._opened = False
+
+    def __wait_for_frame(self):
+        # block until the next frame is "exposed", but never burst to catch up
+        frame_interval = 1.0 / self.fps
+        now = time.monotonic()
+        if self._next_frame_time is None or now - self._next_frame_time > frame_interval:
+            self._next_frame_time = now
+        elif now < self._next_frame_time:
+            time.sleep(self._next_frame_time - now)
+        self._next_frame_time += frame_interval
+
+    def __render_pattern(self):
+        # one period of hue gradient with darker stripes ...
+        x = np.arange(self.width)
+        hls = np.empty((self.height, self.width, 3), np.uint8)
+        hls[..., 0] = (x * 180 // self.width).astype(np.uint8)
+        hls[..., 1] = 128
+        hls[..., 2] = 255
+        img = cv.cvtColor(hls, cv.COLOR_HLS2BGR)
+        img[:, (x // 20) % 2 == 0] //= 2
+
+        # ... plus some "boats" crossing the finish line
+        axes = (max(self.width // 10, 1), max(self.height // 12, 1))
+        for i, bx in enumerate(range(0, self.width, max(self.width // 3, 1))):
+            center = (bx + axes[0], (i % 3 + 1) * self.height // 4)
+            cv.ellipse(img, center, axes, 0, 0, 360, (30, 30, 30), -1)
+
+        # two periods side by side allow slicing any offset without wrapping
+        return np.hstack([img, img])
@@ -25,17 +25,16 @@ class TimeSpanGrabber:
         self.grabber = grabber
 
         self.width = self.grabber.time_span * self.grabber.fps * self.grabber.slot_width
-        self.height = self.grabber.src_height
-        self.img = np.full((self.height, self.width, 3), (200, 200, 200), np.uint8)
         self.metadata = {
             "session_name": self.grabber.session_name,
             "time_start": time_start,
             "time_span": self.grabber.time_span,
             "index": index,
-            "height": self.height,
+            "height": self.grabber.src_height,
             "frame_count": 0,
             "fps": 0,
         }
+        self.__init_image(self.grabber.src_height)
 
         self.done = False
         self.exit_after = False
@@ -60,6 +59,9 @@ class TimeSpanGrabber:
                 time_passed = time.time() - self.metadata["time_start"]
 
             src = self.grabber.capture_frame()
+            if src.shape[0] != self.height:
+                # the frame size taken from the camera format cache was stale (see Grabber.capture_frame)
+                self.__init_image(src.shape[0])
             left = round(time_passed * self.grabber.fps * self.grabber.slot_width)
             middle_left = self.grabber.src_middle_left
 
@@ -107,6 +109,11 @@ class TimeSpanGrabber:
             time.sleep(time_to_sleep)
             slept += time_to_sleep
 
+    def __init_image(self, height):
+        self.height = height
+        self.img = np.full((self.height, self.width, 3), (200, 200, 200), np.uint8)
+        self.metadata["height"] = self.height
+
     def __takeTestImage(self):
         self.img[:] = ((self.metadata["index"] * 11 % 360), 50, 255)
         self.img = cv.cvtColor(self.img, cv.COLOR_HLS2RGB)
\ No newline at end of file
@@ -1,21 +1,25 @@
 import asyncio
 import json
 import logging
-from datetime import datetime
+import mimetypes
+import time
+from datetime import datetime, timezone
 
-import numpy as np
-import cv2 as cv
-
-from quart import Quart, render_template, websocket, send_from_directory
+from quart import Quart, Response, abort, jsonify, render_template, request, websocket, send_from_directory
 from hypercorn.asyncio import serve
 from hypercorn.config import Config
 
 import finishcam.pubsub
+from finishcam.archive import SessionStore
+from finishcam.measurement import MeasurementService
+from finishcam.livestream import AdaptiveStream, LiveEncoder, parse_client_hints
+from finishcam.startup import TimelineLogFilter
 
 app = Quart(__name__)
 app.config["TEMPLATES_AUTO_RELOAD"] = True
 app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 0
 app.active_ws_tasks = set()  # Track live WebSocket tasks for cancellation
+app.live_stream_level = None  # Pins the live stream quality level of all clients (benchmarks)
 
 
 @app.after_request
@@ -39,9 +43,35 @@ async def home():
 @app.route("/data/<path:path>")
 async def serve_data_file(path):
     logging.info("Serving data: %s/%s", app.outdir, path)
+    session_name, _, name = path.partition("/")
+    if name and app.session_store.is_packed(session_name):
+        # packed session: one seek + read in the session archive
+        try:
+            archive = await asyncio.to_thread(app.session_store.archive, session_name)
+            data = await asyncio.to_thread(archive.read, name)
+        except FileNotFoundError:
+            abort(404)
+        # same validators and conditional/range handling as send_from_directory
+        response = Response(data, mimetype=mimetypes.guess_type(name)[0] or "application/octet-stream")
+        response.set_etag(archive.etag(name))
+        response.last_modified = datetime.fromtimestamp(archive.mtime, timezone.utc)
+        return await response.make_conditional(request, accept_ranges=True, complete_length=len(data))
     return await send_from_directory(app.outdir, path)
 
 
+@app.route("/api/measure", methods=["POST"])
+async def measure():
+    """
+    Batch crossing time lookups, see MeasurementService.measure for the query format.
+    Expects a JSON list of queries and returns a list of results in the same order.
+    """
+    queries = await request.get_json(force=True, silent=True)
+    if not isinstance(queries, list):
+        abort(400)
+    results = await asyncio.to_thread(app.measurement.measure_batch, queries)
+    return jsonify(results)
+
+
 @app.route("/js/<path:path>")
 async def serve_js_file(path):
     logging.info("Serving js file: ./js/%s", path)
@@ -52,47 +82,92 @@ async def serve_js_file(path):
 async def ws_live():
     task = asyncio.current_task()
     app.active_ws_tasks.add(task)
+    send_task = None
+    ack_task = None
     try:
+        requested_subprotocols = websocket.requested_subprotocols
+        await websocket.accept(subprotocol="live-image" if "live-image" in requested_subprotocols else None)
+        stream = AdaptiveStream(acks="image-ack" in requested_subprotocols, pinned_level=app.live_stream_level,
+                                **parse_client_hints(requested_subprotocols))
+        if stream.acks:
+            ack_task = asyncio.create_task(_receive_acks(stream))
+
         last_index = None
+        last_stream_params = None
         with finishcam.pubsub.Subscription(app.hub) as event:
             while True:
                 await event.wait()
-                if "live_image" in app.hub.data:
-                    fut = None
+                started = time.perf_counter()
+                sending = send_task is not None and not send_task.done()
+                # skip this frame while the client has a backlog (never queue images per client)
+                if "live_image" in app.hub.data and stream.can_send(started, sending):
+                    messages = []
                     metadata = app.hub.data["live_metadata"]
                     if last_index != metadata['index']:
-                        # Schedule metadata send early to parallelize with image encoding
-                        json_bytes = bytearray(json.dumps(metadata), 'utf-8')
-                        try:
-                            fut = websocket.send(np.insert(json_bytes, 0, 1))
-                        except Exception as e:
-                            logging.debug("Metadata send failed: %s", e)
+                        messages.append(_message(1, json.dumps(metadata).encode('utf-8')))
                         last_index = metadata['index']
 
-                    # Compress image in background
-                    retval, buf = await asyncio.to_thread(cv.imencode,
-                        ".webp", app.hub.data["live_image"], [cv.IMWRITE_WEBP_QUALITY, 30]
+                    # Compress image in background (shared with all clients using the same settings)
+                    img = app.hub.data["live_image"]
+                    height, width = img.shape[:2]
+                    scale = stream.scale_for(width, height)
+                    buf = await app.live_encoder.encode(
+                        img, (metadata['index'], metadata['frame_count']), scale, stream.quality
                     )
 
-                    try:
-                        if fut is not None:
-                            await fut  # Await metadata send after image is ready
-                        await websocket.send(np.insert(buf, 0, 0))
-                    except Exception as e:
-                        logging.debug("Image send failed: %s", e)
+                    stream_params = {"scale": scale, "quality": stream.quality, "interval": stream.interval,
+                                     "width": width, "height": height}
+                    if stream_params != last_stream_params:
+                        # lets the client display downscaled images at full size
+                        messages.append(_message(2, json.dumps(stream_params).encode('utf-8')))
+                        last_stream_params = stream_params
+                    messages.append(_message(0, buf.tobytes()))
+
+                    stream.image_sent(time.perf_counter())
+                    send_task = asyncio.create_task(_send_messages(messages, stream))
 
-                await asyncio.sleep(.3)
+                await asyncio.sleep(max(0.0, stream.interval - (time.perf_counter() - started)))
                 event.clear()
     except asyncio.CancelledError:
         logging.info("WebSocket task was cancelled")
     finally:
         app.active_ws_tasks.discard(task)
+        for pending in (send_task, ack_task):
+            if pending is not None:
+                pending.cancel()
         try:
             await websocket.close()
         except Exception as e:
             logging.debug("WebSocket close failed: %s", e)
 
 
+async def _send_messages(messages, stream):
+    # runs as its own task, so a blocked send does not stall ws_live's accounting
+    try:
+        for message in messages:
+            await websocket.send(message)
+    except Exception as e:
+        logging.debug("Live image send failed: %s", e)
+        return
+    if not stream.acks:
+        stream.image_delivered(time.perf_counter())
+
+
+async def _receive_acks(stream):
+    # js/live.js acknowledges every image it received
+    try:
+        while True:
+            if await websocket.receive() == "ack":
+                stream.image_delivered(time.perf_counter())
+    except Exception as e:
+        logging.debug("Receiving acks failed: %s", e)
+
+
+def _message(message_type, payload):
+    # live websocket messages: one type byte (0: image, 1: metadata, 2: stream settings) + payload
+    return bytes([message_type]) + payload
+
+
 def create_task(hub, session_name, outdir, shutdown_event: asyncio.Event):
     return asyncio.create_task(start(hub, session_name, outdir, shutdown_event))
 
@@ -101,6 +176,9 @@ async def start(hub, session_name, outdir, shutdown_event: asyncio.Event):
     app.hub = hub
     app.session_name = session_name
     app.outdir = outdir
+    app.session_store = SessionStore(outdir)
+    app.measurement = MeasurementService(app.session_store)
+    app.live_encoder = LiveEncoder()
     app.virtual_start_time = datetime.now()
     app.active_ws_tasks = set()  # Reset task tracking
 
@@ -109,6 +187,9 @@ async def start(hub, session_name, outdir, shutdown_event: asyncio.Event):
     config.certfile = "cert.pem"
     config.keyfile = "key.pem"
 
+    # Hypercorn logs "Running on ..." once its sockets are bound
+    logging.getLogger("hypercorn.error").addFilter(TimelineLogFilter("Running on", "server listening"))
+
     try:
         await serve(app, config, shutdown_trigger=shutdown_event.wait)
     finally:
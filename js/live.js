@@ -8,6 +8,7 @@ class PerpFinishcamLiveElement extends HTMLElement {
         super();
         this.objectURLHistory = [];
         this.timeStartHistory = [];
+        this.sizeHistory = []; // full size of live images (they may arrive downscaled)
         this.currentIndex = -1;
         this.timeDelta = 0; //ms difference between date of metadata retrival and timeStart+timeSpan in metadata
     }
@@ -18,7 +19,11 @@ class PerpFinishcamLiveElement extends HTMLElement {
 
         const loc = new URL(this.getAttribute('href') || window.location.toString());
         const wsUri = (loc.protocol === "https:" ? "wss" : "ws") + "://" + loc.host + "/ws/live";
-        this.webservice = new WebSocket(wsUri, ['live-image', 'metadata']);
+        // optional hints for the server to limit the resolution of live images (e.g. on slow connections)
+        const hints = ['max-width', 'max-height']
+            .filter(name => parseInt(this.getAttribute(name)) > 0)
+            .map(name => `${name}-${parseInt(this.getAttribute(name))}`);
+        this.webservice = new WebSocket(wsUri, ['live-image', 'metadata', 'image-ack', ...hints]);
         this.webservice.binaryType = "arraybuffer";
         this.webservice.onmessage = event => this.handleMessage(event.data);
     }
@@ -52,6 +57,9 @@ class PerpFinishcamLiveElement extends HTMLElement {
             const blob = new Blob([bytes.slice(1)], { type: "image/webp" });
             const objectURL = URL.createObjectURL(blob);
             this.objectURLHistory[this.currentIndex] = objectURL;
+            this.sizeHistory[this.currentIndex] = this.streamParams;
+            // lets the server adapt the stream to how fast images actually arrive
+            this.webservice.send('ack');
         }
         else if (type == 1) {
             const metadata = JSON.parse(new TextDecoder().decode(bytes.slice(1)));
@@ -63,6 +71,11 @@ class PerpFinishcamLiveElement extends HTMLElement {
             this.timeDelta = now.getTime() - timeStart.getTime();
             this.timeSpan = metadata.time_span;
         }
+        else if (type == 2) {
+            // adaptive streaming settings chosen by the server: scale, quality, interval, width, height
+            this.streamParams = JSON.parse(new TextDecoder().decode(bytes.slice(1)));
+            return;
+        }
         this.render();
     }
 
@@ -87,6 +100,15 @@ class PerpFinishcamLiveElement extends HTMLElement {
             else {  
               img.src = this.currentSession ? `/data/${this.currentSession}/img${index}.webp` : '#';
             }
+            const size = this.objectURLHistory[index] && this.sizeHistory[index];
+            if (size && size.scale < 1) {
+              img.width = size.width;
+              img.height = size.height;
+            }
+            else {
+              img.removeAttribute('width');
+              img.removeAttribute('height');
+            }
             img.style.flex = '1 1 0';
             img.style.objectFit = 'cover';
             img.style.objectPosition = 'top left';
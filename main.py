@@ -5,12 +5,10 @@ import sys
 import time
 import signal
 
-import finishcam.grabber
-import finishcam.webapp
-import finishcam.preview
 import finishcam.pubsub
 
 from finishcam.logfilters import apply_shutdown_log_filter
+from finishcam.startup import timeline, CameraFormatCache
 
 # Suppress known noisy log entries (harmless shutdown-related warnings)
 apply_shutdown_log_filter()
@@ -40,10 +38,12 @@ async def start(args):
     loop = asyncio.get_running_loop()
     setup_signal_handler(loop)
 
-    # Prepare tasks
+    # Prepare tasks, importing only the subsystems needed (OpenCV, Quart etc. are slow to import)
     tasks = []
     if not args.no_capture:
-        tasks.append(finishcam.grabber.create_task(
+        from finishcam import grabber
+        timeline.mark("grabber imported")
+        tasks.append(grabber.create_task(
             hub, session_name, args.outdir,
             args.time_span, args.fps, args.slot_width, args.left_to_right,
             shutdown_event,
@@ -51,13 +51,20 @@ async def start(args):
             test_mode=args.test_mode, stamp_fps=args.stamp_fps,
             video_capture_index=args.video_capture_index,
             resolution=args.resolution,
+            synthetic_source=args.synthetic,
+            camera_format_cache=CameraFormatCache() if args.fast_start else None,
             enable_ai_image=not args.no_ai,
             debug=args.debug
         ))
         if args.preview is not None:
-            tasks.append(finishcam.preview.create_task(hub, modes=(args.preview or ["raw", "live"])))
+            from finishcam import preview
+            tasks.append(preview.create_task(hub, modes=(args.preview or ["raw", "live"])))
     if not args.no_webserver:
-        tasks.append(finishcam.webapp.create_task(hub, session_name, args.outdir, shutdown_event))
+        # let the grabber start opening the camera (in a thread) before importing the web stack
+        await asyncio.sleep(0)
+        from finishcam import webapp
+        timeline.mark("webapp imported")
+        tasks.append(webapp.create_task(hub, session_name, args.outdir, shutdown_event))
 
     logging.info("Starting %i tasks", len(tasks))
 
@@ -111,6 +118,8 @@ def main():
                         help="Print FPS on each output image")
     parser.add_argument("--test-mode", type=int,
                         help="Create the given amount of test images and exit")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="Use a moving synthetic test pattern instead of a camera (honors --resolution and --fps)")
     parser.add_argument("--webp-quality", type=int, default=90,
                         help="Quality for webp compression (default: 90)")
     parser.add_argument("--no-capture", action="store_true",
@@ -119,6 +128,8 @@ def main():
                         help="Disable webserver (capturing only)")
     parser.add_argument("--no-ai", action="store_true",
                         help="Disable AI for automatic boattip detection")
+    parser.add_argument("--fast-start", action="store_true",
+                        help="Reuse the camera format negotiated at the last start to open the camera in one step without a probe frame")
     parser.add_argument("--debug", action="store_true", help="Start in debug mode (very noisy)")
 
     try: